@@ -1,27 +1,57 @@
 from db import db
-from db.models import Disease, Gene, UserSearch, User
-from flask import Flask, render_template, request, jsonify, send_file, Response, stream_with_context, session, redirect, url_for
+from db.models import Disease, Gene, GeneCompoundActivity, UserSearch, User
+from flask import Flask, render_template, request, jsonify, Response, stream_with_context, session, redirect, url_for
 import os
-import json
+import orjson
 import csv
 import threading
 import queue
-from io import StringIO
+import time
+import concurrent.futures
+import functools
+import hashlib
 from datetime import datetime
-from sqlalchemy import create_engine, MetaData, Table, Column, Integer, String, DateTime, Text
 import bcrypt
+from sqlalchemy import select, text
 from backend import (
 
     build_gene_receptor_ligand_table,
-    fuzzy_search_kegg_disease
+    fuzzy_search_kegg_disease as _fuzzy_search_kegg_disease
 )
 
+@functools.lru_cache(maxsize=4096)
+def _cached_disease_suggestions(normalized_name):
+    suggestions = tuple(_fuzzy_search_kegg_disease(normalized_name))
+    if not suggestions:
+        # The backend returns [] both for genuine no-matches and for KEGG
+        # being unreachable; lru_cache doesn't store raising calls, so
+        # raising here keeps a transient outage from pinning broken
+        # autocomplete for this prefix until restart.
+        raise LookupError(normalized_name)
+    return suggestions
+
+def fuzzy_search_kegg_disease(disease_name):
+    # Autocomplete repeats the same prefixes heavily; normalize so casing and
+    # whitespace variants share a cache entry.
+    try:
+        return list(_cached_disease_suggestions(disease_name.strip().lower()))
+    except LookupError:
+        return []
+
 app = Flask(__name__)
 
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev-key-change-in-production')
 app.config['SQLALCHEMY_DATABASE_URI'] = os.path.join(os.path.abspath(os.path.dirname(__file__)), 'instance', 'diseasenet.db')
 app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + app.config['SQLALCHEMY_DATABASE_URI']
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# Bulk saves in backend.save_to_database write hundreds of rows per disease;
+# a larger insertmanyvalues page lets SQLAlchemy pack them into fewer
+# statements, and pre-ping quietly replaces pooled connections that went
+# stale while the app sat idle.
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+    'insertmanyvalues_page_size': 1000,
+    'pool_pre_ping': True,
+}
 
 db.init_app(app)
 
@@ -29,44 +59,104 @@ UPLOAD_FOLDER = 'uploads'
 OUTPUT_FOLDER = 'outputs'
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 os.makedirs(OUTPUT_FOLDER, exist_ok=True)
-os.makedirs('instance/users', exist_ok=True)
 
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['OUTPUT_FOLDER'] = OUTPUT_FOLDER
 
-with app.app_context():
-    db.create_all()
-
-def get_user_db_path(username):
-    base_dir = os.path.abspath(os.path.dirname(__file__))
-    return os.path.join(base_dir, 'instance', 'users', f'{username}.db')
-
-def init_user_db(username):
-    db_path = get_user_db_path(username)
-    engine = create_engine(f'sqlite:///{db_path}')
-    metadata = MetaData()
-
-    Table('user_search', metadata,
-        Column('id', Integer, primary_key=True),
-        Column('username', String(80), nullable=False),
-        Column('disease_name', String(200), nullable=False),
-        Column('searched_at', DateTime, default=datetime.utcnow)
-    )
-
-    metadata.create_all(engine)
-    return db_path
+def _upgrade_schema():
+    """Patch databases created before recent model changes.
+
+    create_all() only creates missing tables: columns renamed on the models
+    and indexes added to already-existing tables never materialize on a
+    database seeded under the old schema, so they are applied here directly.
+    """
+    with db.engine.begin() as conn:
+        columns = {row[1] for row in conn.execute(text('PRAGMA table_info("user_search")'))}
+        if 'user_email' in columns and 'username' not in columns:
+            conn.execute(text('ALTER TABLE "user_search" RENAME COLUMN "user_email" TO "username"'))
+
+        # Rebuild Gene_compound_activity around its natural (gene, cid) key;
+        # SQLite can't drop a PK in place, so rename-copy-drop. INSERT OR
+        # IGNORE collapses rows the old positional activity_id kept distinct.
+        columns = {row[1] for row in conn.execute(text('PRAGMA table_info("Gene_compound_activity")'))}
+        if 'activity_id' in columns:
+            conn.execute(text('ALTER TABLE "Gene_compound_activity" RENAME TO "Gene_compound_activity_old"'))
+            GeneCompoundActivity.__table__.create(bind=conn)
+            conn.execute(text(
+                'INSERT OR IGNORE INTO "Gene_compound_activity" (ncbi_gene_id, cid, "Ki_concentration") '
+                'SELECT ncbi_gene_id, cid, "Ki_concentration" FROM "Gene_compound_activity_old"'
+            ))
+            conn.execute(text('DROP TABLE "Gene_compound_activity_old"'))
+
+        # Indexes declared on the models but absent from pre-existing tables.
+        for table in db.metadata.tables.values():
+            for index in table.indexes:
+                index.create(bind=conn, checkfirst=True)
+
+# create_all issues a reflection round trip per table before any request is
+# served; once the schema exists it's pure startup latency, so stable
+# deployments can skip it.
+if os.environ.get('SKIP_DB_CREATE') != '1':
+    with app.app_context():
+        db.create_all()
+        _upgrade_schema()
+
+def _calibrate_bcrypt_rounds(max_latency_ms=100, floor=10, ceiling=14):
+    """Pick the highest bcrypt cost whose hash time stays under max_latency_ms."""
+    rounds = floor
+    while rounds < ceiling:
+        start = time.perf_counter()
+        bcrypt.hashpw(b'calibration', bcrypt.gensalt(rounds=rounds + 1))
+        if (time.perf_counter() - start) * 1000 > max_latency_ms:
+            break
+        rounds += 1
+    return rounds
+
+if 'BCRYPT_ROUNDS' in os.environ:
+    app.config['BCRYPT_ROUNDS'] = int(os.environ['BCRYPT_ROUNDS'])
+else:
+    app.config['BCRYPT_ROUNDS'] = _calibrate_bcrypt_rounds()
+
+# bcrypt releases the GIL in its C extension, so hashing on a pool sized to
+# the CPU count lets concurrent signups/logins use all cores instead of
+# serializing on one request thread. The semaphore bounds queued work so a
+# login storm can't pile up unbounded hash jobs.
+BCRYPT_POOL = concurrent.futures.ThreadPoolExecutor(max_workers=os.cpu_count() or 2)
+_bcrypt_slots = threading.BoundedSemaphore(2 * (os.cpu_count() or 2))
+
+def hash_password(password):
+    with _bcrypt_slots:
+        salt = bcrypt.gensalt(rounds=app.config['BCRYPT_ROUNDS'])
+        return BCRYPT_POOL.submit(bcrypt.hashpw, password.encode('utf-8'), salt).result()
+
+def check_password(password, password_hash):
+    # Accounts created before the LargeBinary migration stored the hash as
+    # TEXT; bcrypt.checkpw only accepts bytes.
+    if isinstance(password_hash, str):
+        password_hash = password_hash.encode('utf-8')
+    with _bcrypt_slots:
+        return BCRYPT_POOL.submit(bcrypt.checkpw, password.encode('utf-8'), password_hash).result()
+
+# Verified against when a login names an unknown user, so both branches cost
+# one full bcrypt run and response timing doesn't reveal whether the account
+# exists. Computed lazily on the first failed lookup so imports (and every
+# debug-mode reload) don't pay a full bcrypt run up front; a duplicate
+# computation under a race is harmless.
+_DUMMY_HASH = None
+
+def _dummy_hash():
+    global _DUMMY_HASH
+    if _DUMMY_HASH is None:
+        _DUMMY_HASH = bcrypt.hashpw(b'x', bcrypt.gensalt(rounds=app.config['BCRYPT_ROUNDS']))
+    return _DUMMY_HASH
 
 def save_user_search(username, disease_name):
-    init_user_db(username)
-    engine = create_engine(f'sqlite:///{get_user_db_path(username)}')
-    conn = engine.connect()
-    from sqlalchemy import text
-    conn.execute(
-        text("INSERT INTO user_search (username, disease_name, searched_at) VALUES (:username, :disease, :time)"),
-        {"username": username, "disease": disease_name, "time": datetime.utcnow()}
-    )
-    conn.commit()
-    conn.close()
+    db.session.add(UserSearch(
+        username=username,
+        disease_name=disease_name,
+        searched_at=datetime.utcnow()
+    ))
+    db.session.commit()
 
 @app.route('/')
 def home():
@@ -88,18 +178,18 @@ def signup():
         if len(password) < 6:
             return jsonify({'success': False, 'error': 'Password must be at least 6 characters'}), 400
         
-        existing_user = User.query.filter_by(username=username).first()
+        existing_user = db.session.execute(
+            select(User.id).where(User.username == username)
+        ).scalar_one_or_none()
         if existing_user:
             return jsonify({'success': False, 'error': 'Username already exists'}), 400
         
-        password_hash = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+        password_hash = hash_password(password)
         
         new_user = User(username=username, password_hash=password_hash)
         db.session.add(new_user)
         db.session.commit()
-        
-        init_user_db(username)
-        
+
         session['user'] = {'username': username}
         
         return jsonify({'success': True})
@@ -116,9 +206,13 @@ def login():
         if not username or not password:
             return jsonify({'success': False, 'error': 'Username and password required'}), 400
         
-        user = User.query.filter_by(username=username).first()
-        
-        if not user or not bcrypt.checkpw(password.encode('utf-8'), user.password_hash.encode('utf-8')):
+        user = db.session.execute(
+            select(User).where(User.username == username)
+        ).scalar_one_or_none()
+
+        target_hash = user.password_hash if user else _dummy_hash()
+        ok = check_password(password, target_hash)
+        if not user or not ok:
             return jsonify({'success': False, 'error': 'Invalid username or password'}), 401
         
         session['user'] = {'username': username}
@@ -138,19 +232,21 @@ def history():
         return jsonify({'error': 'Not logged in'}), 401
     
     username = session['user']['username']
-    db_path = get_user_db_path(username)
-    
-    if not os.path.exists(db_path):
-        return jsonify([])
-    
-    engine = create_engine(f'sqlite:///{db_path}')
-    conn = engine.connect()
-    from sqlalchemy import text
-    result = conn.execute(text("SELECT disease_name, searched_at FROM user_search ORDER BY searched_at DESC LIMIT 50"))
-    searches = [{'disease': row[0], 'date': str(row[1])} for row in result]
-    conn.close()
-    
-    return jsonify(searches)
+    rows = db.session.execute(
+        select(UserSearch.disease_name, UserSearch.searched_at)
+        .where(UserSearch.username == username)
+        .order_by(UserSearch.searched_at.desc())
+        .limit(50)
+    ).all()
+
+    # orjson formats the datetimes in C; no per-row str() needed.
+    return Response(
+        orjson.dumps(
+            [{'disease': r.disease_name, 'date': r.searched_at} for r in rows],
+            option=orjson.OPT_NAIVE_UTC
+        ),
+        mimetype='application/json'
+    )
 
 @app.route('/suggest', methods=['POST'])
 def suggest():
@@ -163,10 +259,28 @@ def suggest():
     suggestions = fuzzy_search_kegg_disease(disease_name)
     return jsonify(suggestions)
 
+@functools.lru_cache(maxsize=1)
+def _recent_searches_cached(bucket):
+    searches = Disease.query.order_by(Disease.kegg_disease_id.desc()).limit(10).all()
+    return orjson.dumps([{'name': s.disease_name, 'id': s.kegg_disease_id} for s in searches])
+
 @app.route('/recent_searches', methods=['GET'])
 def get_recent_searches():
-    searches = Disease.query.order_by(Disease.kegg_disease_id.desc()).limit(10).all()
-    return jsonify([{'name': s.disease_name, 'id': s.kegg_disease_id} for s in searches])
+    # 30-second TTL bucket: dashboards poll this endpoint far more often than
+    # the underlying table changes, so skip the query between buckets and let
+    # browsers revalidate with the ETag.
+    payload = _recent_searches_cached(int(time.time() // 30))
+    response = Response(payload, mimetype='application/json')
+    response.headers['Cache-Control'] = 'public, max-age=30'
+    response.set_etag(hashlib.blake2b(payload, digest_size=8).hexdigest())
+    return response.make_conditional(request)
+
+# Constant SSE frame pieces, kept as bytes so each event is one concatenation
+# with the orjson payload instead of an f-string build plus UTF-8 re-encode.
+_PROGRESS_PREFIX = b'event: progress\ndata: '
+_RESULT_PREFIX = b'event: result\ndata: '
+_FRAME_SUFFIX = b'\n\n'
+_DONE_FRAME = b'event: done\ndata: {}\n\n'
 
 @app.route('/stream')
 def stream():
@@ -174,44 +288,101 @@ def stream():
     if not disease_name:
         return jsonify({"error": "No disease name provided"}), 400
 
-    result_queue = queue.Queue()
+    # Bounded so a slow SSE client can't grow the queue without limit.
+    # Progress events are coalescable: on overflow the oldest one is dropped
+    # so the newest state always gets through. Terminal events block instead.
+    result_queue = queue.Queue(maxsize=64)
     current_user = session.get('user')
 
     def progress_callback(current, total, gene_symbol):
-        result_queue.put(('progress', current, total, gene_symbol))
+        item = ('progress', current, total, gene_symbol)
+        try:
+            result_queue.put_nowait(item)
+        except queue.Full:
+            try:
+                result_queue.get_nowait()
+            except queue.Empty:
+                pass
+            try:
+                result_queue.put_nowait(item)
+            except queue.Full:
+                pass
+
+    def put_final(item):
+        # Never block: a client that disconnected mid-search leaves the
+        # queue full of unread progress items, and a blocking put would park
+        # this thread (and the table payload) forever. Evict stale progress
+        # entries until the terminal event fits.
+        while True:
+            try:
+                result_queue.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    result_queue.get_nowait()
+                except queue.Empty:
+                    pass
 
     def run_in_background():
-        with app.app_context():
-            table_data = build_gene_receptor_ligand_table(disease_name, progress_callback)
-            if current_user:
-                save_user_search(current_user['username'], disease_name)
-        result_queue.put(('result', table_data))
-        result_queue.put(('done', None))
+        # The terminal events must reach the generator no matter what fails
+        # here - without them the SSE client polls an idle queue forever. An
+        # empty result degrades to the "No exact match found" suggestion path.
+        table_data = []
+        try:
+            with app.app_context():
+                table_data = build_gene_receptor_ligand_table(disease_name, progress_callback)
+                if current_user:
+                    save_user_search(current_user['username'], disease_name)
+        except Exception:
+            app.logger.exception("Search failed for %s", disease_name)
+        finally:
+            put_final(('result', table_data))
+            put_final(('done', None))
 
     t = threading.Thread(target=run_in_background, daemon=True)
     t.start()
 
     def generate():
+        # Coalesce progress frames: only the latest one within a 50ms window
+        # is written, so fast backends don't produce one socket write per gene.
+        # Result/done frames always flush immediately.
+        pending_progress = None
+        last_emit = time.monotonic()
+
         while True:
-            item = result_queue.get()
-            event_type = item[0]
+            try:
+                item = result_queue.get(timeout=0.05)
+            except queue.Empty:
+                item = None
+
+            if item is not None and item[0] == 'progress':
+                pending_progress = item
+                item = None
+
+            now = time.monotonic()
+            if pending_progress is not None and (item is not None or now - last_emit > 0.05):
+                _, current, total, gene_symbol = pending_progress
+                payload = orjson.dumps({'current': current, 'total': total, 'gene': gene_symbol})
+                yield _PROGRESS_PREFIX + payload + _FRAME_SUFFIX
+                pending_progress = None
+                last_emit = now
+
+            if item is None:
+                continue
 
-            if event_type == 'progress':
-                _, current, total, gene_symbol = item
-                payload = json.dumps({'current': current, 'total': total, 'gene': gene_symbol})
-                yield f"event: progress\ndata: {payload}\n\n"
+            event_type = item[0]
 
-            elif event_type == 'result':
+            if event_type == 'result':
                 _, table_data = item
                 if not table_data:
                     suggestions = fuzzy_search_kegg_disease(disease_name)
-                    payload = json.dumps({'error': 'No exact match found', 'suggestions': suggestions})
+                    payload = orjson.dumps({'error': 'No exact match found', 'suggestions': suggestions})
                 else:
-                    payload = json.dumps(table_data)
-                yield f"event: result\ndata: {payload}\n\n"
+                    payload = orjson.dumps(table_data)
+                yield _RESULT_PREFIX + payload + _FRAME_SUFFIX
 
             elif event_type == 'done':
-                yield f"event: done\ndata: {{}}\n\n"
+                yield _DONE_FRAME
                 break
 
     return Response(
@@ -237,32 +408,40 @@ def process():
     
     if 'user' in session:
         save_user_search(session['user']['username'], disease_name)
-    
-    return jsonify(table_data)
+
+    return Response(orjson.dumps(table_data), mimetype='application/json')
+
+class _EchoWriter:
+    """File-like proxy whose write() hands each CSV line back to the caller."""
+
+    def write(self, value):
+        return value
 
 @app.route('/export_csv', methods=['POST'])
 def export_csv():
     data = request.get_json()
     table_data = data.get('data')
     disease_name = data.get('disease_name', 'results')
-    
+
     if not table_data:
         return jsonify({"error": "No data to export"}), 400
-    
-    output = StringIO()
-    if table_data:
-        headers = list(table_data[0].keys())
-        writer = csv.DictWriter(output, fieldnames=headers)
-        writer.writeheader()
-        writer.writerows(table_data)
-    
+
+    headers = list(table_data[0].keys())
     filename = f"{disease_name.replace(' ', '_')}_results.csv"
-    filepath = os.path.join(OUTPUT_FOLDER, filename)
-    
-    with open(filepath, 'w', newline='', encoding='utf-8') as f:
-        f.write(output.getvalue())
-    
-    return send_file(filepath, as_attachment=True, download_name=filename)
+
+    def generate_csv():
+        writer = csv.DictWriter(_EchoWriter(), fieldnames=headers)
+        yield writer.writeheader()
+        for row in table_data:
+            yield writer.writerow(row)
+
+    return Response(
+        generate_csv(),
+        mimetype='text/csv',
+        headers={'Content-Disposition': f'attachment; filename={filename}'}
+    )
 
 if __name__ == '__main__':
-    app.run(debug=True, threaded=True)
+    # Production runs go through wsgi.py + gunicorn.conf.py; keep the Werkzeug
+    # debugger/reloader out of the hot path unless explicitly requested.
+    app.run(debug=os.environ.get('FLASK_DEBUG') == '1', threaded=True)
@@ -30,6 +30,12 @@ class DiseasePathway(db.Model):
     kegg_disease_id = db.Column(db.String(50), db.ForeignKey("Disease.kegg_disease_id"), primary_key=True)
     kegg_pathway_id = db.Column(db.String(45), db.ForeignKey("Pathway.kegg_pathway_id"), primary_key=True)
 
+    # The composite PK only serves lookups led by the disease id; this covers
+    # the reverse direction (pathway -> diseases).
+    __table_args__ = (
+        db.Index("idx_dp_pathway", "kegg_pathway_id"),
+    )
+
 
 class Gene(db.Model):
     __tablename__ = "Gene"
@@ -50,6 +56,10 @@ class DiseaseGene(db.Model):
     kegg_disease_id = db.Column(db.String(50), db.ForeignKey("Disease.kegg_disease_id"), primary_key=True)
     ncbi_gene_id = db.Column(db.String(45), db.ForeignKey("Gene.ncbi_gene_id"), primary_key=True)
 
+    __table_args__ = (
+        db.Index("idx_dg_gene", "ncbi_gene_id"),
+    )
+
 
 class UniprotProtein(db.Model):
     __tablename__ = "uniprot_protein"
@@ -65,6 +75,10 @@ class GeneUniprotBridge(db.Model):
     ncbi_gene_id = db.Column(db.String(45), db.ForeignKey("Gene.ncbi_gene_id"), primary_key=True)
     uniprot_id = db.Column(db.String(45), db.ForeignKey("uniprot_protein.uniprot_id"), primary_key=True)
 
+    __table_args__ = (
+        db.Index("idx_gub_uniprot", "uniprot_id"),
+    )
+
 
 class UniprotPdb(db.Model):
     __tablename__ = "uniprot_pdb"
@@ -72,6 +86,10 @@ class UniprotPdb(db.Model):
     uniprot_id = db.Column(db.String(45), db.ForeignKey("uniprot_protein.uniprot_id"), primary_key=True)
     pdb_id = db.Column(db.String(45), primary_key=True)
 
+    __table_args__ = (
+        db.Index("idx_upp_pdb", "pdb_id"),
+    )
+
 
 class UniprotInteraction(db.Model):
     __tablename__ = "Uniprot_interaction"
@@ -90,23 +108,24 @@ class Compound(db.Model):
 class GeneCompoundActivity(db.Model):
     __tablename__ = "Gene_compound_activity"
 
-    activity_id = db.Column(db.String(45), primary_key=True)
-    ncbi_gene_id = db.Column(db.String(45), db.ForeignKey("Gene.ncbi_gene_id"), nullable=False)
-    cid = db.Column(db.String(45), db.ForeignKey("Compound.CID"), nullable=False)
+    # The old synthetic activity_id VARCHAR ("<gene>_<cid>_<idx>") only
+    # encoded uniqueness the natural key already provides; the composite PK
+    # keeps the index compact.
+    ncbi_gene_id = db.Column(db.String(45), db.ForeignKey("Gene.ncbi_gene_id"), primary_key=True)
+    cid = db.Column(db.String(45), db.ForeignKey("Compound.CID"), primary_key=True)
     Ki_concentration = db.Column(db.Text, nullable=True)
 
 
 class UserSearch(db.Model):
     __tablename__ = "user_search"
-    
+
     id = db.Column(db.Integer, primary_key=True)
-    user_email = db.Column(db.String(120), nullable=False)
+    username = db.Column(db.String(80), nullable=False)
     disease_name = db.Column(db.String(200), nullable=False)
     searched_at = db.Column(db.DateTime, default=db.func.current_timestamp())
-    
+
     __table_args__ = (
-        db.Index("idx_user_email", "user_email"),
-        db.Index("idx_searched_at", "searched_at"),
+        db.Index("idx_usersearch_user_time", "username", "searched_at"),
     )
 
 
@@ -115,7 +134,9 @@ class User(db.Model):
     
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
-    password_hash = db.Column(db.String(255), nullable=False)
+    # bcrypt output is always 60 bytes; storing it raw avoids re-encoding the
+    # hash on every login.
+    password_hash = db.Column(db.LargeBinary(60), nullable=False)
     created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
     
     __table_args__ = (
@@ -1,4 +1,6 @@
 from app import app
 
+application = app
+
 if __name__ == "__main__":
     app.run()